@@ -0,0 +1,62 @@
+"""Shared clients for cloud storage services."""
+
+import threading
+from functools import update_wrapper
+from typing import Callable, Generic, Optional, TypeVar
+
+import boto3  # type: ignore
+from google.cloud import storage  # type: ignore
+
+T = TypeVar("T")
+
+
+class _SharedClient(Generic[T]):
+    """
+    Create a client on first use and then reuse it.
+
+    Downloads run in several threads at once, so the first calls can happen at the same time. The client is created
+    under a lock, so only one is ever made and client creation never runs concurrently.
+    """
+
+    def __init__(self, create: Callable[[], T]):
+        self._create = create
+        self._client: Optional[T] = None
+        self._lock = threading.Lock()
+        update_wrapper(self, create)
+
+    def __call__(self) -> T:
+        client = self._client
+        if client is None:
+            with self._lock:
+                client = self._client
+                if client is None:
+                    client = self._client = self._create()
+        return client
+
+    def cache_clear(self) -> None:
+        """Forget the client, so that the next call creates a new one."""
+        with self._lock:
+            self._client = None
+
+
+@_SharedClient
+def gcs_client() -> storage.Client:
+    """
+    Get the Google Cloud Storage client.
+
+    The client is created on first use and then reused, so credentials are only discovered once and connections are
+    shared between downloads and uploads. Clients are thread-safe.
+    """
+    return storage.Client()
+
+
+@_SharedClient
+def s3_client():
+    """
+    Get the S3 client.
+
+    The client is created on first use and then reused, so credentials are only discovered once and connections are
+    shared between downloads and uploads. Clients are thread-safe, but boto3 sessions are not, so the client is made
+    from its own session rather than boto3's shared default one.
+    """
+    return boto3.session.Session().client("s3")
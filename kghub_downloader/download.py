@@ -14,25 +14,91 @@ function. That function will be called for that scheme with three arguments:
 
 import ftplib
 import os
+import posixpath
+import queue
+import re
+import shutil
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import contextmanager
-from fnmatch import fnmatch
+from contextvars import ContextVar
+from fnmatch import fnmatch, translate
 from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
 
-import boto3  # type: ignore
 import gdown  # type: ignore
 import requests
-from google.cloud import storage  # type: ignore
 from google.cloud.storage.blob import Blob  # type: ignore
+from requests.adapters import HTTPAdapter
 from tqdm import tqdm
+from urllib3.util.retry import Retry
 
+from kghub_downloader.clients import gcs_client, s3_client
 from kghub_downloader.model import DownloadableResource, DownloadOptions
 from kghub_downloader.schemes import register_scheme
 
 GOOGLE_DRIVE_PREFIX = "https://drive.google.com/uc?id="
 
 SNIPPET_SIZE = 1024 * 5
-CHUNK_SIZE = 1024
+CHUNK_SIZE = 1024 * 1024
+
+# Buffer writes to downloaded files, so that small chunks from a download are written to disk in large blocks
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Most FTP servers limit the number of simultaneous connections per user to somewhere between 4 and 10
+FTP_MAX_WORKERS = 4
+
+# Connections kept open per host. Large enough for every download thread to hold its own connection to one host.
+HTTP_POOL_SIZE = 32
+
+# Shared by all HTTP(S) downloads so that connections to the same host are kept alive and reused
+_SESSION = requests.Session()
+
+# Retry failed connections and transient server errors a few times, backing off 0.2s, 0.4s, 0.8s. The last response is
+# still returned if it was an error, so that raise_for_status reports it.
+_HTTP_RETRY = Retry(total=3, backoff_factor=0.2, status_forcelist=(429, 500, 502, 503, 504), raise_on_status=False)
+
+_HTTP_ADAPTER = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE, max_retries=_HTTP_RETRY)
+_SESSION.mount("http://", _HTTP_ADAPTER)
+_SESSION.mount("https://", _HTTP_ADAPTER)
+
+# GitHub releases and their asset download URLs, keyed by (owner, repository), fetched at most once per run
+_RELEASES_CACHE: Dict[Tuple[str, str], List[dict]] = {}
+_RELEASE_ASSETS_CACHE: Dict[Tuple[str, str], Tuple[Dict[Tuple[str, str], str], Dict[str, str]]] = {}
+
+
+# Set by download_from_yaml for each download it runs. Once the event is set, the download stops at its next write.
+stop_event: ContextVar[Optional[threading.Event]] = ContextVar("stop_event", default=None)
+
+
+class DownloadStopped(Exception):
+    """Raised inside a download that was told to stop, because another download failed or was interrupted."""
+
+
+def _raise_if_stopped(event: Optional[threading.Event]) -> None:
+    """Raise DownloadStopped if the given stop event is set."""
+    if event is not None and event.is_set():
+        raise DownloadStopped()
+
+
+class _StoppableWriter:
+    """Wraps a file so that writing to it raises DownloadStopped once the stop event is set."""
+
+    def __init__(self, fd, event: threading.Event):
+        """Wrap the file descriptor fd."""
+        self._fd = fd
+        self._event = event
+
+    def write(self, data):
+        """Write data to the file, unless the download has been told to stop."""
+        _raise_if_stopped(self._event)
+        return self._fd.write(data)
+
+    def __getattr__(self, name):
+        """Pass everything else through to the file."""
+        return getattr(self._fd, name)
 
 
 def log_result(fn):
@@ -58,12 +124,18 @@ def open_with_write_progress(
     size: int = 0,
     open_mode: str = "wb"
 ):
-    """Open the given file and wrap its write method in a tqdm progress bar."""
-    outfile_fd = outfile_path.open(open_mode)
+    """
+    Open the given file and wrap its write method in a tqdm progress bar.
+
+    Writes raise DownloadStopped once the download has been told to stop (see stop_event).
+    """
+    outfile_fd = outfile_path.open(open_mode, buffering=WRITE_BUFFER_SIZE)
+    event = stop_event.get()
+    writer = outfile_fd if event is None else _StoppableWriter(outfile_fd, event)
     try:
         if show_progress:
             with tqdm.wrapattr(
-                outfile_fd,
+                writer,
                 "write",
                 desc=f"{item.expanded_url}",
                 total=size,
@@ -73,17 +145,24 @@ def open_with_write_progress(
             ) as file:
                 yield file
         else:
-            yield outfile_fd
+            yield writer
     finally:
         outfile_fd.close()
 
 
+def copy_response(response: requests.Response, outfile) -> None:
+    """Copy the body of a streamed response to a file, undoing any content encoding such as gzip."""
+    # Read straight from the underlying urllib3 response, which avoids iter_content's per-chunk generator overhead
+    response.raw.decode_content = True
+    shutil.copyfileobj(response.raw, outfile, length=CHUNK_SIZE)
+
+
 @register_scheme("gs")
 @log_result
 def google_cloud_storage(item: DownloadableResource, outfile_path: Path, options: DownloadOptions) -> None:
     """Download from Google Cloud Storage."""
     url = item.expanded_url
-    blob = Blob.from_string(url, client=storage.Client())
+    blob = Blob.from_string(url, client=gcs_client())
     with open_with_write_progress(item, outfile_path, options.progress, blob.size) as outfile:
         blob.download_to_file(outfile)
 
@@ -102,37 +181,75 @@ def google_drive(item: DownloadableResource, outfile_path: Path, options: Downlo
 def s3(item: DownloadableResource, outfile_path: Path, options: DownloadOptions) -> None:
     """Download from S3 bucket."""
     url = item.expanded_url
-    s3 = boto3.resource("s3")
+    s3 = s3_client()
     bucket_name = url.split("/")[2]
     remote_file = "/".join(url.split("/")[3:])
 
-    s3_object = s3.Object(bucket_name, remote_file)
-    object_size = s3_object.content_length
+    object_size = s3.head_object(Bucket=bucket_name, Key=remote_file)["ContentLength"]
 
     with open_with_write_progress(item, outfile_path, options.progress, object_size) as outfile:
-        s3_object.download_fileobj(outfile)
+        s3.download_fileobj(bucket_name, remote_file, outfile)
 
 
 @register_scheme("ftp")
 @log_result
 def ftp(item: DownloadableResource, outfile_path: Path, options: DownloadOptions) -> None:
     """Download from an FTP server."""
-    url = item.expanded_url
+    url = urlsplit(item.expanded_url)
 
     ftp_username = os.getenv("FTP_USERNAME", None)
     ftp_password = os.getenv("FTP_PASSWORD", "")
 
-    host = url.split("/")[0]
-    path = "/".join(url.split("/")[1:])
-
-    ftp = ftplib.FTP(host)  # noqa:S321
-
-    if ftp_username is None:
-        ftp.login()
-    else:
-        ftp.login(ftp_username, ftp_password)
-
-    download_via_ftp(ftp, path, str(outfile_path), item.glob)
+    def connect():
+        ftp_server = ftplib.FTP(url.hostname)  # noqa:S321
+        if ftp_username is None:
+            ftp_server.login()
+        else:
+            ftp_server.login(ftp_username, ftp_password)
+        return ftp_server
+
+    with connect() as ftp_server:
+        download_via_ftp(ftp_server, url.path, str(outfile_path), item.glob, connect=connect)
+
+
+def get_github_releases(repo_owner: str, repo_name: str) -> List[dict]:
+    """
+    Get the list of releases for a GitHub repository.
+
+    Results are cached so that several assets from the same repository only cost one API request. If the
+    GITHUB_TOKEN environment variable is set, it is used to authenticate the request.
+    """
+    key = (repo_owner, repo_name)
+    if key not in _RELEASES_CACHE:
+        api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases"
+        headers = {}
+        github_token = os.getenv("GITHUB_TOKEN")
+        if github_token:
+            headers["Authorization"] = f"Bearer {github_token}"
+        response = _SESSION.get(api_url, headers=headers, timeout=10)
+        response.raise_for_status()
+        _RELEASES_CACHE[key] = response.json()
+    return _RELEASES_CACHE[key]
+
+
+def get_github_release_assets(repo_owner: str, repo_name: str) -> Tuple[Dict[Tuple[str, str], str], Dict[str, str]]:
+    """
+    Get the download URLs of the release assets of a GitHub repository.
+
+    Returns two dictionaries: one keyed by (tag, asset name), and one keyed by asset name alone which holds the
+    asset from the newest release that has it.
+    """
+    key = (repo_owner, repo_name)
+    if key not in _RELEASE_ASSETS_CACHE:
+        assets_by_tag: Dict[Tuple[str, str], str] = {}
+        latest_assets: Dict[str, str] = {}
+        # Releases are listed newest first
+        for release in get_github_releases(repo_owner, repo_name):
+            for asset in release.get("assets", []):
+                assets_by_tag[(release["tag_name"], asset["name"])] = asset["browser_download_url"]
+                latest_assets.setdefault(asset["name"], asset["browser_download_url"])
+        _RELEASE_ASSETS_CACHE[key] = (assets_by_tag, latest_assets)
+    return _RELEASE_ASSETS_CACHE[key]
 
 
 @register_scheme("git")
@@ -144,41 +261,16 @@ def git(item: DownloadableResource, outfile_path: Path, options: DownloadOptions
     repo_owner = url_split[-3]
     repo_name = url_split[-2]
     asset_name = url_split[-1]
-    asset_url = None
-    api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases"
-    # Get the list of releases
-    response = requests.get(api_url, timeout=10)
-    response.raise_for_status()
-    releases = response.json()
+    releases = get_github_releases(repo_owner, repo_name)
 
     if not releases:
         print("No releases found for this repository.")
         # FIXME: Raise error here rather than exiting
         sys.exit(1)
 
-    # Check if a specific tag is provided
-    if item.tag is not None:
-        # Find the release with the specified tag
-        tagged_release = next(
-            (release for release in releases if release["tag_name"] == item.tag),
-            None,
-        )
-        if tagged_release:
-            for asset in tagged_release.get("assets", []):
-                if asset["name"] == asset_name:
-                    asset_url = asset["browser_download_url"]
-                    break
-
-    # If no asset found in the specified tag or no tag provided, check other
-    # releases
-    if not asset_url:
-        for release in releases:
-            for asset in release.get("assets", []):
-                if asset["name"] == asset_name:
-                    asset_url = asset["browser_download_url"]
-                    break
-            if asset_url:
-                break
+    # Prefer the asset from the release with the given tag, falling back to the newest release that has it
+    assets_by_tag, latest_assets = get_github_release_assets(repo_owner, repo_name)
+    asset_url = assets_by_tag.get((item.tag, asset_name)) or latest_assets.get(asset_name)
 
     if not asset_url:
         print(f"Asset '{asset_name}' not found in any release.")
@@ -186,12 +278,11 @@ def git(item: DownloadableResource, outfile_path: Path, options: DownloadOptions
         sys.exit(1)
 
     # Download the asset
-    response = requests.get(asset_url, stream=True, timeout=10)
+    response = _SESSION.get(asset_url, stream=True, timeout=10)
     response.raise_for_status()
     size = int(response.headers.get("Content-Length", 0))
     with open_with_write_progress(item, outfile_path, options.progress, size) as outfile:
-        for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
-            outfile.write(chunk)
+        copy_response(response, outfile)
 
 
 @register_scheme("http")
@@ -205,7 +296,12 @@ def http(item: DownloadableResource, outfile_path: Path, options: DownloadOption
         gdown.download(url, output=str(outfile_path))
         return
 
-    response = requests.get(url, headers={"User-Agent": "Mozilla/5.0"}, stream=True, timeout=10)
+    headers = {"User-Agent": "Mozilla/5.0"}
+    if options.snippet_only:
+        # Servers that support range requests will only send the snippet
+        headers["Range"] = f"bytes=0-{SNIPPET_SIZE - 1}"
+
+    response = _SESSION.get(url, headers=headers, stream=True, timeout=10)
     response.raise_for_status()
 
     size = int(response.headers.get("Content-Length", 0))
@@ -213,22 +309,17 @@ def http(item: DownloadableResource, outfile_path: Path, options: DownloadOption
         size = SNIPPET_SIZE
 
     with open_with_write_progress(item, outfile_path, options.progress, size) as outfile:
-        size = 0
-        for chunk in response.iter_content(CHUNK_SIZE):
-            outfile.write(chunk)
-            if options.snippet_only:
-                size += CHUNK_SIZE
-                if size >= SNIPPET_SIZE:
-                    response.close()
+        if options.snippet_only:
+            snippet = b""
+            for chunk in response.iter_content(SNIPPET_SIZE):
+                snippet += chunk[: SNIPPET_SIZE - len(snippet)]
+                if len(snippet) == SNIPPET_SIZE:
                     break
-
-    # Remove last line from output if snippet was downloaded
-    if options.snippet_only:
-        with open(str(outfile_path), "r+") as fd:
-            data = fd.readlines()
-            fd.seek(0)
-            fd.write("\n".join(data[:-1]))
-            fd.truncate()
+            response.close()
+            # Leave out the trailing partial line
+            outfile.write(snippet[: snippet.rfind(b"\n") + 1])
+        else:
+            copy_response(response, outfile)
 
 
 def is_directory(ftp_server, name):
@@ -243,39 +334,146 @@ def is_directory(ftp_server, name):
         ftp_server.cwd(current)  # Always change back to the original directory
 
 
+def compile_glob(glob_pattern):
+    """Compile a glob pattern to a regular expression once, rather than for every filename it is matched against."""
+    return re.compile(translate(os.path.normcase(glob_pattern))) if glob_pattern else None
+
+
 def is_matching_filename(filename, glob_pattern):
-    """Check if the filename matches the glob pattern."""
-    return fnmatch(filename, glob_pattern) if glob_pattern else True
+    """Check if the filename matches the glob pattern, which may be precompiled with compile_glob."""
+    if not glob_pattern:
+        return True
+    if isinstance(glob_pattern, str):
+        return fnmatch(filename, glob_pattern)
+    # Normalize case the same way fnmatch does, so a compiled pattern matches the same names
+    return glob_pattern.match(os.path.normcase(filename)) is not None
 
 
-def download_via_ftp(ftp_server, current_dir, local_dir, glob_pattern=None):
-    """Recursively download files from an FTP server matching the glob pattern."""
+def list_ftp_directory(ftp_server):
+    """
+    List the current directory on an FTP server as (name, is directory) pairs.
+
+    Uses MLSD, which returns the type of every entry in a single response. Entries of other types, such as symlinks,
+    are probed with is_directory, as are all entries on servers that don't support MLSD and are listed with NLST.
+    """
+    try:
+        entries = [
+            (name, facts.get("type"))
+            for name, facts in ftp_server.mlsd(facts=["type"])
+            if facts.get("type") not in ("cdir", "pdir")
+        ]
+    except ftplib.error_perm:
+        return [(name, is_directory(ftp_server, name)) for name in ftp_server.nlst()]
+
+    listing = []
+    for name, entry_type in entries:
+        if entry_type in ("file", "dir"):
+            listing.append((name, entry_type == "dir"))
+        else:
+            listing.append((name, is_directory(ftp_server, name)))
+    return listing
+
+
+def list_ftp_files(ftp_server, current_dir, local_dir, glob_pattern=None, remote_dir=""):
+    """
+    Recursively list the files on an FTP server matching the glob pattern.
+
+    Returns a list of (remote path, local path) pairs. Remote paths are relative to the directory the listing
+    started in, which is also the working directory of the FTP connection once this function returns.
+    """
+    ftp_server.cwd(current_dir)
+
+    files = []
+    for item, item_is_directory in list_ftp_directory(ftp_server):
+        if item_is_directory:
+            files.extend(
+                list_ftp_files(
+                    ftp_server,
+                    item,
+                    os.path.join(local_dir, item),
+                    glob_pattern,
+                    posixpath.join(remote_dir, item),
+                )
+            )
+            # Go back to the parent directory
+            ftp_server.cwd("..")
+        elif is_matching_filename(item, glob_pattern):
+            files.append((posixpath.join(remote_dir, item), os.path.join(local_dir, item)))
+    return files
+
+
+def retrieve_ftp_file(ftp_server, remote_path, local_path, event=None):
+    """
+    Download a single file from an FTP server, creating its local directory if needed.
+
+    Raises DownloadStopped between blocks once the given stop event is set.
+    """
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    with open(local_path, "wb") as f:
+
+        def write(block):
+            _raise_if_stopped(event)
+            f.write(block)
+
+        ftp_server.retrbinary(f"RETR {remote_path}", write)
+
+
+def download_via_ftp(ftp_server, current_dir, local_dir, glob_pattern=None, connect=None, max_workers=FTP_MAX_WORKERS):
+    """
+    Recursively download files from an FTP server matching the glob pattern.
+
+    The directory tree is listed over the given connection. If a `connect` function is passed, it is called to open
+    more connections, so that up to `max_workers` files are transferred in parallel, one per connection. The given
+    connection counts as one of them. If the server refuses more connections, the files are transferred over the
+    connections that could be opened, down to just the given connection.
+    """
+    # Transfers run in their own threads, so pass them this download's stop event explicitly
+    event = stop_event.get()
     try:
-        # Change to the current directory on the FTP server
-        ftp_server.cwd(current_dir)
-
-        # List items in the current directory
-        items = ftp_server.nlst()
-
-        # Initialize tqdm progress bar
-        with tqdm(total=len(items), desc=f"Downloading from {current_dir} via ftp") as pbar:
-            for item in items:
-                # Check if the item is a directory
-                if is_directory(ftp_server, item):
-                    # Recursively download from the found directory
-                    download_via_ftp(ftp_server, item, os.path.join(local_dir, item), glob_pattern)
-                    # Go back to the parent directory
-                    ftp_server.cwd("..")
-                else:
-                    # Check if the file matches the pattern
-                    if is_matching_filename(item, glob_pattern):
-                        # Download the file
-                        local_filepath = os.path.join(local_dir, item)
-                        os.makedirs(os.path.dirname(local_filepath), exist_ok=True)
-                        with open(local_filepath, "wb") as f:
-                            ftp_server.retrbinary(f"RETR {item}", f.write)
-                # Update the progress bar after each item is processed
-                pbar.update(1)
+        files = list_ftp_files(ftp_server, current_dir, local_dir, compile_glob(glob_pattern))
+        if not files:
+            return
+
+        with tqdm(total=len(files), desc=f"Downloading from {current_dir} via ftp") as pbar:
+            # ftplib connections are not thread-safe, so every connection is used by one transfer at a time
+            extra_connections = []
+            try:
+                if connect is not None:
+                    for _ in range(min(max_workers, len(files)) - 1):
+                        try:
+                            worker_ftp = connect()
+                        except ftplib.error_temp as e:
+                            # e.g. 421 Too many connections. Carry on with the connections that are already open.
+                            print(f"Could not open another FTP connection, continuing with fewer: {e}")
+                            break
+                        extra_connections.append(worker_ftp)
+                        worker_ftp.cwd(current_dir)
+
+                if not extra_connections:
+                    for remote_path, local_path in files:
+                        retrieve_ftp_file(ftp_server, remote_path, local_path, event)
+                        pbar.update(1)
+                    return
+
+                idle_connections: queue.SimpleQueue = queue.SimpleQueue()
+                for worker_ftp in [ftp_server, *extra_connections]:
+                    idle_connections.put(worker_ftp)
+
+                def retrieve(remote_path, local_path):
+                    worker_ftp = idle_connections.get()
+                    try:
+                        retrieve_ftp_file(worker_ftp, remote_path, local_path, event)
+                    finally:
+                        idle_connections.put(worker_ftp)
+
+                with ThreadPoolExecutor(max_workers=len(extra_connections) + 1) as executor:
+                    futures = [executor.submit(retrieve, remote_path, local_path) for remote_path, local_path in files]
+                    for future in as_completed(futures):
+                        future.result()
+                        pbar.update(1)
+            finally:
+                for worker_ftp in extra_connections:
+                    worker_ftp.close()
     except ftplib.error_perm as e:
         # Handle permission errors
         print(f"Permission denied: {e}")
@@ -1,20 +1,159 @@
 """The main functionality for downloading resources, as defined by the class in model.py."""
 
 import logging
+import os
 import pathlib
+import shutil
+import threading
 import time
 import traceback
-from typing import List, Optional
-from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
 
 import typer
 import yaml
+from pydantic import TypeAdapter
 from tqdm.auto import tqdm
 
-from kghub_downloader import schemes, upload
+from kghub_downloader import download, schemes, upload
 from kghub_downloader.elasticsearch import download_from_elastic_search
 from kghub_downloader.model import DownloadableResource, DownloadOptions
 
+# Use the libyaml bindings if they are available, they are much faster than the pure Python loader
+YAMLLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Validates a whole download.yaml in one pass
+_RESOURCES_ADAPTER = TypeAdapter(List[DownloadableResource])
+
+
+@lru_cache(maxsize=8)
+def _load_yaml(path: str, mtime_ns: int) -> Any:
+    """
+    Parse a YAML file.
+
+    Results are cached by path and modification time, so a file is only parsed again if it has changed. The returned
+    data is shared between callers and must not be modified.
+    """
+    with open(path) as f:
+        return yaml.load(f, Loader=YAMLLoader)  # noqa: S506 (always a safe loader)
+
+
+def deduplicate_resources(resources: List[DownloadableResource]) -> List[DownloadableResource]:
+    """
+    Drop resources that have the same output path as an earlier resource.
+
+    Resources are downloaded concurrently, so two resources writing to the same file would overwrite each other. The
+    first resource for each path is kept, as it was when resources were downloaded in order and later ones were found
+    to already exist.
+    """
+    seen: Dict[pathlib.Path, str] = {}
+    deduplicated = []
+    for item in resources:
+        if item.path in seen:
+            if seen[item.path] == item.url:
+                logging.info(f"Skipping duplicate entry for {item.url}")
+            else:
+                logging.warning(f"Skipping {item.url}: {item.path} is already downloaded from {seen[item.path]}")
+            continue
+        seen[item.path] = item.url
+        deduplicated.append(item)
+    return deduplicated
+
+
+def _remove_path(path: pathlib.Path) -> None:
+    """Remove a file, or a directory and its contents (FTP resources are downloaded into a directory)."""
+    if path.is_dir() and not path.is_symlink():
+        shutil.rmtree(path)
+    else:
+        path.unlink(missing_ok=True)
+
+
+def download_resource(
+    item: DownloadableResource,
+    output_dir: pathlib.Path,
+    download_options: DownloadOptions,
+    mirror: Optional[str] = None,
+    stop: Optional[threading.Event] = None,
+) -> bool:
+    """
+    Download a single resource, and mirror it if requested.
+
+    The resource is downloaded to a .part file next to its output path, which is only renamed to the output path once
+    the download has succeeded. An interrupted download never leaves a file that looks like a cached copy.
+
+    Args:
+        item: The resource to download.
+        output_dir: The directory the resource's path is relative to.
+        download_options: An object containing boolean flags that change download behavior
+        mirror: Optional remote storage URL to mirror download to.
+        stop: Optional event that stops the download at its next write once set.
+
+    Returns:
+        True if the resource was downloaded, False if it was skipped.
+
+    """
+    url = item.expanded_url
+    outfile_path = output_dir / item.path
+
+    logging.info("Retrieving %s from %s" % (item.path, url))
+
+    # Can't truncate compressed file
+    if download_options.snippet_only and item.is_compressed_file:
+        logging.error("Asked to download snippets; can't snippet {}".format(item))
+        return False
+
+    outfile_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # A single stat both checks for a cached copy and guards against empty leftovers of an earlier run
+    try:
+        is_cached = outfile_path.stat().st_size > 0
+    except FileNotFoundError:
+        is_cached = False
+
+    if is_cached:
+        if download_options.ignore_cache:
+            logging.info(f"Deleting cached version of {outfile_path}")
+            _remove_path(outfile_path)
+        else:
+            logging.info(f"Using cached version of {outfile_path}")
+            tqdm.write(f"SKIPPING: {outfile_path} already exists")
+            return False
+
+    part_path = outfile_path.with_name(outfile_path.name + ".part")
+    # Clear out anything left behind by an earlier run that was killed
+    _remove_path(part_path)
+
+    stop_token = download.stop_event.set(stop)
+    try:
+        if item.api is not None:
+            if item.api == "elasticsearch":
+                download_from_elastic_search(item, str(part_path))
+            else:
+                raise RuntimeError(f"API {item.api} not supported")
+        else:
+            download_fn = schemes.available_schemes.get(urlsplit(url).scheme, None)
+
+            if download_fn is None:
+                raise ValueError(f"Invalid URL scheme for url {url}")
+
+            download_fn(item, part_path, download_options)
+
+        # FTP downloads that match no files don't create any output
+        if os.path.lexists(part_path):
+            os.replace(part_path, outfile_path)
+    except BaseException:
+        _remove_path(part_path)
+        raise
+    finally:
+        download.stop_event.reset(stop_token)
+
+    if mirror:
+        upload.mirror_to_bucket(outfile_path, mirror, item.path)
+
+    return True
+
 
 def download_from_yaml(
     yaml_file: str,
@@ -33,6 +172,8 @@ def download_from_yaml(
         tags: Limit to only downloads with this tag
         mirror: Optional remote storage URL to mirror download to. Supported buckets: Google Cloud Storage
 
+    Resources are downloaded concurrently, by up to `download_options.max_workers` threads.
+
     """
     start_time = time.time()
 
@@ -41,94 +182,66 @@ def download_from_yaml(
 
     pathlib.Path(output_dir).mkdir(parents=True, exist_ok=True)
 
-    with open(yaml_file) as f:
-        data = yaml.load(f, Loader=yaml.FullLoader)
+    yaml_path = os.path.abspath(yaml_file)
+    data = _load_yaml(yaml_path, os.stat(yaml_path).st_mtime_ns)
 
-    resources: List[DownloadableResource] = [DownloadableResource(**x) for x in data]
+    resources = _RESOURCES_ADAPTER.validate_python(data)
 
     # Limit to only tagged downloads, if tags are passed in
     if tags:
         resources = [item for item in resources if item.tag in tags]
 
+    resources = deduplicate_resources(resources)
+
     successful_ct = 0
     unsuccessful_ct = 0
     skipped_ct = 0
 
     pbar = tqdm(
-        resources,
+        total=len(resources),
         position=2,
         leave=False,
         bar_format="Downloading {n_fmt}/{total_fmt} [{bar:20}]",
         ascii=".█",
     )
 
-    for item in resources:
-        pbar.update()
-        pbar.refresh()
-        url = item.expanded_url
-        outfile_path = output_dir / item.path
-        outfile_dir = outfile_path.parent
-
-        logging.info("Retrieving %s from %s" % (item.path, url))
-
-        # Can't truncate compressed file
-        if download_options.snippet_only and item.is_compressed_file:
-            logging.error("Asked to download snippets; can't snippet {}".format(item))
-            continue
-
-        if not outfile_dir.exists():
-            logging.info(f"Creating local directory {outfile_dir}")
-            outfile_dir.mkdir(parents=True, exist_ok=True)
-
-        if outfile_path.exists():
-            if download_options.ignore_cache:
-                logging.info(f"Deleting cached version of {outfile_path}")
-                outfile_path.unlink()
-            else:
-                logging.info("Using cached version of {outfile_path")
-                tqdm.write(f"SKIPPING: {outfile_path} already exists")
-                skipped_ct += 1
-                continue
-
-        # Download file
-        if item.api is not None:
-            if item.api == "elasticsearch":
-                download_from_elastic_search(item, str(outfile_path))
-            else:
-                raise RuntimeError(f"API {item.api} not supported")
-            continue
-
-        parsed_url = urlparse(item.expanded_url)
-        download_fn = schemes.available_schemes.get(parsed_url.scheme, None)
-
-        if download_fn is None:
-            raise ValueError(f"Invalid URL scheme for url {item.expanded_url}")
-
-        try:
-            download_fn(item, outfile_path, download_options)
-            successful_ct += 1
-        except BaseException as e:
-            unsuccessful_ct += 1
-            if outfile_path.exists():
-                outfile_path.unlink()
-
-            if download_options.fail_on_error:
-                raise e
-
-            # If this was cancelled with Ctrl-C, re-raise the exception and let Typer handle it
-            if isinstance(e, KeyboardInterrupt):
-                pbar.close()
-                raise e
-
-            if download_options.verbose:
-                message = traceback.format_exception(e)[-1]
-                tqdm.write(f"{message}")
-
-            continue
-
-        if mirror:
-            upload.mirror_to_bucket(outfile_path, mirror, item.path)
-
+    max_workers = max(1, min(download_options.max_workers, len(resources)))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    stop = threading.Event()
+    futures = [
+        executor.submit(download_resource, item, pathlib.Path(output_dir), download_options, mirror, stop)
+        for item in resources
+    ]
+
+    try:
+        for future in as_completed(futures):
+            pbar.update()
+            pbar.refresh()
+            try:
+                if future.result():
+                    successful_ct += 1
+                else:
+                    skipped_ct += 1
+            except BaseException as e:
+                unsuccessful_ct += 1
+
+                # If this was cancelled with Ctrl-C, re-raise the exception and let Typer handle it
+                if download_options.fail_on_error or isinstance(e, KeyboardInterrupt):
+                    raise e
+
+                if download_options.verbose:
+                    message = traceback.format_exception(e)[-1]
+                    tqdm.write(f"{message}")
+    except BaseException:
+        # Stop scheduling downloads on the first error, or if this was cancelled with Ctrl-C. Downloads that are
+        # already running stop at their next write and remove their partial output, which is waited for here.
+        # Google Drive downloads can't be stopped, and run to completion.
+        stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+        pbar.close()
+        raise
+
+    executor.shutdown()
     pbar.close()
     exec_time = time.time() - start_time
 
@@ -2,6 +2,8 @@
 
 import json
 import os
+from functools import lru_cache
+from typing import Iterable, Iterator
 
 import compress_json  # type: ignore
 import elasticsearch
@@ -10,6 +12,13 @@ from tqdm.auto import tqdm
 
 from kghub_downloader.model import DownloadableResource
 
+try:
+    import orjson  # type: ignore
+except ImportError:
+    orjson = None
+
+PROGRESS_BATCH_SIZE = 1024
+
 
 def download_from_elastic_search(yaml_item: DownloadableResource, outfile: str) -> None:
     """
@@ -32,23 +41,79 @@ def download_from_elastic_search(yaml_item: DownloadableResource, outfile: str)
         raise ValueError("No elasticsearch index was provided in item" "configuration")
 
     # FIXME: Validate query file and index parameters exist
-    query_data = compress_json.local_load(os.path.join(os.getcwd(), yaml_item.query_file))
-    records = elastic_search_query(es_conn, index=yaml_item.index, query=query_data)
+    query_data = load_query(os.path.join(os.getcwd(), yaml_item.query_file))
+    # Only keep the order of the results if the query asks for one, otherwise scroll in the cheaper _doc order
+    records = elastic_search_query(
+        es_conn,
+        index=yaml_item.index,
+        query=query_data,
+        preserve_order="sort" in query_data,
+    )
 
-    with open(outfile, "w") as output:
-        json.dump(records, output)
+    write_json(records, outfile)
 
     return None
 
 
+@lru_cache(maxsize=32)
+def _load_query(path: str, mtime_ns: int) -> dict:
+    """
+    Load an Elasticsearch query from a (possibly compressed) JSON file.
+
+    Results are cached by path and modification time, so a file is only read and parsed again if it has changed.
+    """
+    return compress_json.local_load(path)
+
+
+def load_query(path: str) -> dict:
+    """
+    Load an Elasticsearch query from a (possibly compressed) JSON file.
+
+    Query files are often shared by several resources, so each file is only read and parsed once unless it changes.
+    The returned query is shared between callers and must not be modified.
+    """
+    return _load_query(path, os.stat(path).st_mtime_ns)
+
+
+def dump_json(record: dict) -> bytes:
+    """
+    Serialize a single record to JSON.
+
+    Uses orjson if it is installed, which is considerably faster than the standard library for large result sets.
+    Falls back to the standard library for values orjson cannot serialize, such as integers wider than 64 bits.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(record)
+        except orjson.JSONEncodeError:
+            pass
+    # Match orjson's compact UTF-8 output, so the file looks the same whichever serializer was used
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def write_json(records: Iterable[dict], outfile: str) -> None:
+    """
+    Write records to a file as a JSON array.
+
+    Records are serialized and written one at a time, so the whole result set never has to be held in memory.
+    """
+    with open(outfile, "wb") as output:
+        output.write(b"[")
+        for i, record in enumerate(records):
+            if i > 0:
+                output.write(b", ")
+            output.write(dump_json(record))
+        output.write(b"]")
+
+
 def elastic_search_query(
     es_connection: elasticsearch.Elasticsearch,
     index: str,
     query: str,
     scroll: str = "1m",
     request_timeout: int = 60,
-    preserve_order: bool = True,
-):
+    preserve_order: bool = False,
+) -> Iterator[dict]:
     """
     Fetch records from the given URL and query parameters.
 
@@ -58,12 +123,13 @@ def elastic_search_query(
         query: query
         scroll: scroll parameter passed to elastic search
         request_timeout: timeout parameter passed to elastic search
-        preserve_order: preserve order param passed to elastic search
-    Returns:
-        All records for query
+        preserve_order: preserve order param passed to elastic search. If False (the default), the query's sort is
+            replaced by _doc, the fastest order to scroll in.
+
+    Yields:
+        Each record for query, as it is scrolled from elastic search
 
     """
-    records = []
     results = elasticsearch.helpers.scan(
         client=es_connection,
         index=index,
@@ -73,7 +139,11 @@ def elastic_search_query(
         query=query,
     )
 
-    for item in tqdm(results, desc="querying for index: " + index):
-        records.append(item)
-
-    return records
+    # Update the progress bar in batches, rather than paying tqdm's overhead for every record
+    count = 0
+    with tqdm(desc="querying for index: " + index, unit="docs") as pbar:
+        for count, record in enumerate(results, start=1):
+            yield record
+            if count % PROGRESS_BATCH_SIZE == 0:
+                pbar.update(PROGRESS_BATCH_SIZE)
+        pbar.update(count % PROGRESS_BATCH_SIZE)
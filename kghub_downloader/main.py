@@ -44,6 +44,10 @@ def main(
         Optional[List[str]],
         typer.Option(help="Optional list of tags to limit downloading to"),
     ] = None,
+    max_workers: Annotated[
+        int,
+        typer.Option(help="Maximum number of resources to download at the same time", min=1),
+    ] = 8,
     mirror: Annotated[
         Optional[str],
         typer.Option(help="Optional remote storage URL to mirror download to. Supported buckets: Google Cloud Storage"),
@@ -56,6 +60,7 @@ def main(
         progress=progress,
         fail_on_error=fail_on_error,
         verbose=verbose,
+        max_workers=max_workers,
     )
 
     download_from_yaml(
@@ -3,12 +3,15 @@
 import os
 import pathlib
 import re
+from functools import cached_property
 from typing import Literal, Optional, Union
+from urllib.parse import urlsplit
 
 from pydantic import BaseModel, Field, FilePath
 
 valid_url_schemes = [
     "http",
+    "https",
     "gs",
     "gdrive",  # FIXME: document
     "git",
@@ -16,6 +19,28 @@ valid_url_schemes = [
     "ftp",
 ]
 
+# URLs must start with one of the valid schemes, followed by a colon
+url_pattern = r"^(?:" + "|".join(valid_url_schemes) + r"):"
+
+# Environment variables to expand in URLs, in {curly braces}. Braces around anything that is not a valid variable name
+# are left as they are.
+environment_variable_pattern = re.compile(r"\{([A-Za-z_][A-Za-z0-9_]*)\}")
+
+# Files that cannot be cut down to a snippet without corrupting them
+compressed_file_suffixes = {".zip", ".gz", ".bz2", ".xz", ".zst"}
+
+
+def _expand_environment_variable(match: re.Match) -> str:
+    """Replace a matched {VARIABLE} with the value of the environment variable."""
+    name = match.group(1)
+    value = os.getenv(name)
+    if value is None:
+        raise ValueError(
+            f"Environment Variable: {name} is not set. Please set the "
+            "variable using export or similar, and try again."
+        )
+    return value
+
 
 class DownloadOptions(BaseModel):
     """Options for downloading a resource."""
@@ -25,12 +50,13 @@ class DownloadOptions(BaseModel):
     progress: bool = False
     fail_on_error: bool = True
     verbose: bool = False
+    max_workers: int = 8
 
 
 class DownloadableResource(BaseModel):
     """A resource able to be downloaded."""
 
-    url: str = Field(pattern=r"^" + "|".join(valid_url_schemes))
+    url: str = Field(pattern=url_pattern)
     api: Optional[Union[Literal["elasticsearch"]]] = None
     tag: Optional[str] = None
     local_name: Optional[str] = None
@@ -40,7 +66,7 @@ class DownloadableResource(BaseModel):
     query_file: Optional[FilePath] = None
     index: Optional[str] = None
 
-    @property
+    @cached_property
     def path(self) -> pathlib.Path:
         """
         The filename of the output file.
@@ -50,27 +76,22 @@ class DownloadableResource(BaseModel):
         filename = self.local_name or self.url.split("/")[-1]
         return pathlib.Path(filename)
 
-    @property
+    @cached_property
     def is_compressed_file(self):
         """
         Checks whether a file is compressed.
 
         Used to check whether a snippet of the resource can be downloaded.
         """
-        return self.path.suffix in ["zip", "gz"]
+        # The URL's own path is checked too, as the default local name keeps any query string after the suffix
+        url_path = pathlib.PurePosixPath(urlsplit(self.url).path)
+        return any(path.suffix.lower() in compressed_file_suffixes for path in (self.path, url_path))
 
-    @property
+    @cached_property
     def expanded_url(self) -> str:
-        """Parses a URL for any environment variables enclosed in {curly braces}."""
-        pattern = r".*?\{(.*?)\}"
-        url = self.url
-        match = re.findall(pattern, url)
-        for i in match:
-            secret = os.getenv(i)
-            if secret is None:
-                raise ValueError(
-                    f"Environment Variable: {i} is not set. Please set the "
-                    "variable using export or similar, and try again."
-                )
-            url = url.replace("{" + i + "}", secret)
-        return url
+        """
+        Parses a URL for any environment variables enclosed in {curly braces}.
+
+        The result is computed on first access and cached for the lifetime of the resource.
+        """
+        return environment_variable_pattern.sub(_expand_environment_variable, self.url)
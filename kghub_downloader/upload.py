@@ -1,25 +1,97 @@
 """Functions for uploading resources to a mirror."""
 
+import base64
+import hashlib
+import os
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional
 
-import boto3  # type: ignore
-from botocore.exceptions import NoCredentialsError  # type: ignore
+import google_crc32c  # type: ignore
+from boto3.s3.transfer import TransferConfig  # type: ignore
+from botocore.exceptions import ClientError, NoCredentialsError  # type: ignore
+from google.api_core.exceptions import GoogleAPICallError  # type: ignore
 from google.cloud import storage  # type: ignore
 
+from kghub_downloader.clients import gcs_client, s3_client
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Read local files in large blocks while uploading
+UPLOAD_BUFFER_SIZE = 1024 * 1024
+
+# Upload files of up to 64 MiB in a single request, and larger files in 64 MiB parts. This takes fewer requests than
+# boto3's default of 8 MiB, and files uploaded in one part keep an MD5 ETag, which lets unchanged files be skipped.
+S3_TRANSFER_CONFIG = TransferConfig(multipart_threshold=64 * 1024 * 1024, multipart_chunksize=64 * 1024 * 1024)
+
+
+def _local_crc32c(local_fd: BinaryIO) -> str:
+    """Compute the base64-encoded CRC32C checksum of an open file, in the format reported by GCS."""
+    checksum = google_crc32c.Checksum()
+    for chunk in iter(lambda: local_fd.read(HASH_CHUNK_SIZE), b""):
+        checksum.update(chunk)
+    local_fd.seek(0)
+    return base64.b64encode(checksum.digest()).decode("ascii")
+
+
+def _local_md5(local_fd: BinaryIO) -> str:
+    """Compute the hex MD5 digest of an open file, in the format of a single-part S3 ETag."""
+    md5 = hashlib.md5(usedforsecurity=False)
+    for chunk in iter(lambda: local_fd.read(HASH_CHUNK_SIZE), b""):
+        md5.update(chunk)
+    local_fd.seek(0)
+    return md5.hexdigest()
+
+
+def _gcs_blob_matches(blob: storage.Blob, local_fd: BinaryIO, local_size: int) -> bool:
+    """
+    Check whether a GCS blob already holds the same bytes as an open local file.
+
+    Blobs that can't be read, because they don't exist or the credentials are only allowed to create objects, never
+    match and are uploaded.
+    """
+    try:
+        blob.reload()
+    except GoogleAPICallError:
+        return False
+    if blob.size != local_size:
+        return False
+    return blob.crc32c == _local_crc32c(local_fd)
+
+
+def _s3_object_matches(s3, bucket_name: str, key: str, local_fd: BinaryIO, local_size: int) -> bool:
+    """
+    Check whether an S3 object already holds the same bytes as an open local file.
+
+    Objects uploaded in multiple parts have an ETag that is not an MD5 digest, so they never match and are re-uploaded.
+    """
+    try:
+        head = s3.head_object(Bucket=bucket_name, Key=key)
+    except ClientError:
+        return False
+    if head["ContentLength"] != local_size:
+        return False
+    return head["ETag"].strip('"') == _local_md5(local_fd)
+
 
 def mirror_to_bucket(local_file: Path, bucket_url: str, remote_file: Path) -> Optional[bool]:
-    """Mirror a local file to an S3 bucket."""
+    """
+    Mirror a local file to an S3 bucket.
+
+    Uploads are skipped if the remote object already has the same size and checksum as the local file.
+    """
     bucket_split = bucket_url.split("/")
     bucket_name = bucket_split[2]
-    with open(local_file, "rb"):
+    # The file is opened once, and the same handle is used to compare checksums and to upload
+    with open(local_file, "rb", buffering=UPLOAD_BUFFER_SIZE) as local_fd:
+        local_size = os.fstat(local_fd.fileno()).st_size
+
         if bucket_url.startswith("gs://"):
 
             # Remove any trailing slashes (Google gets confused)
             bucket_url = bucket_url.rstrip("/")
 
             # Connect to GCS Bucket
-            storage_client = storage.Client()
+            storage_client = gcs_client()
             bucket = storage_client.bucket(bucket_name)
 
             # Upload blob from local file
@@ -33,23 +105,28 @@ def mirror_to_bucket(local_file: Path, bucket_url: str, remote_file: Path) -> Op
 
             blob = bucket.blob(f"{bucket_path}/{remote_file}") if bucket_path else bucket.blob(remote_file)
 
+            if _gcs_blob_matches(blob, local_fd, local_size):
+                print(f"Remote mirror of {local_file} is up to date, skipping upload")
+                return None
+
             print(f"Uploading {local_file} to remote mirror: " "gs://{blob.name}/")
-            blob.upload_from_filename(local_file)
+            blob.upload_from_file(local_fd, size=local_size)
 
         elif bucket_url.startswith("s3://"):
             # Create an S3 client
-            s3 = boto3.client("s3")
+            s3 = s3_client()
 
             try:
+                if _s3_object_matches(s3, bucket_name, str(remote_file), local_fd, local_size):
+                    print(f"Remote mirror of {local_file} is up to date, skipping upload")
+                    return True
+
                 # Upload the file
                 # ! This will only work if the user has the AWS IAM user
                 # ! access keys set up as environment variables.
-                s3.upload_file(local_file, bucket_name, remote_file)
+                s3.upload_fileobj(local_fd, bucket_name, str(remote_file), Config=S3_TRANSFER_CONFIG)
                 print(f"File {local_file} uploaded to " "{bucket_name}/{remote_file}")
                 return True
-            except FileNotFoundError:
-                print(f"The file {local_file} was not found")
-                return False
             except NoCredentialsError:
                 print("Credentials not available")
                 return False
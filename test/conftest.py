@@ -1,38 +1,144 @@
-"""Fixtures for s3."""
+"""Fixtures for s3 and offline downloads, and options for selecting tests."""
 
-import os
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+from unittest import mock
 
 import boto3  # type: ignore
 import moto
 import pytest
+import responses
 
+from kghub_downloader import clients, download
+from kghub_downloader.download_utils import download_from_yaml
 
-@pytest.fixture(scope="function")
+TEST_FILE = Path("test/resources/testfile.txt")
+
+GITHUB_ASSET_URL = "https://github.com/Knowledge-Graph-Hub/kg-microbe/releases/download/v0.0.1/testfile.zip"
+
+
+def pytest_addoption(parser):
+    """Add an option to run slow tests."""
+    parser.addoption("--runslow", action="store_true", default=False, help="Also run tests marked as slow")
+
+
+def pytest_configure(config):
+    """Register the slow marker."""
+    config.addinivalue_line("markers", "slow: slow test, only run with --runslow")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip tests marked as slow unless --runslow is passed."""
+    if config.getoption("--runslow"):
+        return
+    skip_slow = pytest.mark.skip(reason="needs --runslow to run")
+    for item in items:
+        if "slow" in item.keywords:
+            item.add_marker(skip_slow)
+
+
+@pytest.fixture(scope="session", autouse=True)
 def mock_aws_credentials():
-    """Fixture to mock AWS Credentials for moto."""
-    os.environ["AWS_ACCESS_KEY_ID"] = "testing"
-    os.environ["AWS_SECRET_ACCESS_KEY"] = "testing"  # noqa: S105
-    os.environ["AWS_SECURITY_TOKEN"] = "testing"  # noqa: S105
-    os.environ["AWS_SESSION_TOKEN"] = "testing"  # noqa: S105
-    os.environ["AWS_DEFAULT_REGION"] = "us-east-1"
+    """Fixture to mock AWS Credentials for moto, so tests can never reach a real AWS account."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("AWS_ACCESS_KEY_ID", "testing")
+        mp.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+        mp.setenv("AWS_SECURITY_TOKEN", "testing")
+        mp.setenv("AWS_SESSION_TOKEN", "testing")
+        mp.setenv("AWS_DEFAULT_REGION", "us-east-1")
+        yield
 
 
-@pytest.fixture(scope="function")
-def mock_empty_bucket(mock_aws_credentials):
-    """Fixture to mock an empty AWS bucket."""
+@pytest.fixture(scope="session")
+def mock_s3():
+    """Fixture to mock AWS with a single bucket. Moto is only started once per test session, as it is slow to start."""
     moto_fake = moto.mock_aws()
     try:
         moto_fake.start()
+        # Make sure the shared S3 client is created with the mocked credentials
+        clients.s3_client.cache_clear()
         conn = boto3.resource("s3")
         conn.create_bucket(Bucket="monarch-test")  # or the name of the bucket you use
         yield conn
     finally:
         moto_fake.stop()
+        clients.s3_client.cache_clear()
+
+
+@pytest.fixture(scope="function")
+def mock_empty_bucket(mock_s3):
+    """Fixture to mock an empty AWS bucket."""
+    bucket = mock_s3.Bucket("monarch-test")
+    bucket.objects.all().delete()
+    yield mock_s3
+    bucket.objects.all().delete()
+
 
 @pytest.fixture(scope="function")
 def mock_s3_test_file(mock_empty_bucket):
     """Fixture to populate the mock S3 bucket with a test file."""
-    s3 = boto3.client("s3")
-    s3.put_object(Body="test data", Bucket="monarch-test", Key="kghub_downloader_test_file.yaml")
+    mock_empty_bucket.Object("monarch-test", "kghub_downloader_test_file.yaml").put(Body="test data")
     yield
-    s3.delete_object(Bucket="monarch-test", Key="kghub_downloader_test_file.yaml")
+
+
+@contextmanager
+def serve_example_resources():
+    """
+    Serve every resource in example/download.yaml locally, so it can be downloaded without a network.
+
+    S3 resources are served by moto, and need to be put in the mock bucket by the caller.
+    """
+    test_data = TEST_FILE.read_bytes()
+
+    def fake_gdown_download(url, output, **kwargs):
+        Path(output).write_bytes(test_data)
+        return output
+
+    fake_blob = mock.MagicMock(size=len(test_data))
+    fake_blob.download_to_file.side_effect = lambda outfile: outfile.write(test_data)
+
+    download._RELEASES_CACHE.clear()
+    download._RELEASE_ASSETS_CACHE.clear()
+    try:
+        with ExitStack() as stack:
+            stack.enter_context(mock.patch.object(download.gdown, "download", side_effect=fake_gdown_download))
+            stack.enter_context(mock.patch.object(download, "gcs_client"))
+            stack.enter_context(mock.patch.object(download.Blob, "from_string", return_value=fake_blob))
+            rsps = stack.enter_context(responses.RequestsMock(assert_all_requests_are_fired=False))
+            rsps.get("https://zfin.org/downloads/phenoGeneCleanData_fish.txt", body=test_data)
+            rsps.get(
+                "https://api.github.com/repos/Knowledge-Graph-Hub/kg-microbe/releases",
+                json=[
+                    {
+                        "tag_name": "v0.0.1",
+                        "assets": [{"name": "testfile.zip", "browser_download_url": GITHUB_ASSET_URL}],
+                    }
+                ],
+            )
+            rsps.get(GITHUB_ASSET_URL, body=test_data)
+            yield
+    finally:
+        download._RELEASES_CACHE.clear()
+        download._RELEASE_ASSETS_CACHE.clear()
+
+
+@pytest.fixture(scope="function")
+def mock_example_resources():
+    """Fixture to serve every resource in example/download.yaml locally, for the duration of one test."""
+    with serve_example_resources():
+        yield
+
+
+@pytest.fixture(scope="session")
+def downloaded_example_outputs(tmp_path_factory, mock_s3):
+    """Download everything in example/download.yaml once per test session, and return the output directory."""
+    output_dir = tmp_path_factory.mktemp("example_download")
+    test_file = mock_s3.Object("monarch-test", "kghub_downloader_test_file.yaml")
+    test_file.put(Body=TEST_FILE.read_bytes())
+    try:
+        # Only mock the other services for the download itself, so they stay unmocked for later tests
+        with serve_example_resources():
+            download_from_yaml(yaml_file="example/download.yaml", output_dir=str(output_dir))
+    finally:
+        test_file.delete()
+    return output_dir
@@ -1,88 +1,128 @@
-import os
-import unittest
-from os.path import exists
+import asyncio
 from pathlib import Path
 
 import pytest
+import responses
 
 from kghub_downloader import download, model
 from kghub_downloader.download_utils import download_from_yaml
 from kghub_downloader.model import DownloadOptions
 
-# ruff: noqa: D100, D101, D102
+# ruff: noqa: D100, D101, D102, D103
 
+# Output paths, relative to the output directory used in example/download.yaml
 output_files = {
-    "https": Path("test/output/zfin/fish_phenotype.txt"),
-    "google_cloud_storage": Path("test/output/google_storage_test.yaml"),
-    "google_drive_1": Path("test/output/gdrive_test_1.txt"),
-    "google_drive_2": Path("test/output/gdrive_test_2.txt"),
-    "s3": Path("test/output/s3_test.yaml"),
-    "git": Path("test/output/git_test.zip"),
+    "https": Path("zfin/fish_phenotype.txt"),
+    "google_cloud_storage": Path("google_storage_test.yaml"),
+    "google_drive_1": Path("gdrive_test_1.txt"),
+    "google_drive_2": Path("gdrive_test_2.txt"),
+    "s3": Path("s3_test.yaml"),
+    "git": Path("git_test.zip"),
 }
 
 
-class TestDownload(unittest.TestCase):
-    def setUp(self):
-        for file in output_files.values():
-            if file.exists():
-                file.unlink()
-            if not file.parent.exists():
-                file.parent.mkdir(parents=True)
+def assert_file_exists(file_path: Path):
+    assert file_path.exists(), f"File {file_path} does not exist"
+    assert file_path.stat().st_size > 0, f"File {file_path} is empty"
 
-    def _assert_file_exists(self, file_path: Path):
-        self.assertTrue(file_path.exists(), f"File {file_path} does not exist")
-        self.assertTrue(file_path.stat().st_size > 0, f"File {file_path} is empty")
 
-    def test_http(self):
+class TestDownload:
+    @responses.activate
+    def test_http(self, tmp_path):
+        test_data = Path("test/resources/testfile.txt").read_bytes()
+        responses.get("https://zfin.org/downloads/phenoGeneCleanData_fish.txt", body=test_data)
+
+        resource = model.DownloadableResource(url="https://zfin.org/downloads/phenoGeneCleanData_fish.txt")
+        output_file = tmp_path / output_files["https"]
+        output_file.parent.mkdir()
+        download.http(resource, output_file, DownloadOptions())
+        assert output_file.read_bytes() == test_data
+
+    @pytest.mark.slow
+    def test_http_network(self, tmp_path):
         resource = model.DownloadableResource(url="https://zfin.org/downloads/phenoGeneCleanData_fish.txt")
-        output_file = output_files["https"]
+        output_file = tmp_path / output_files["https"]
+        output_file.parent.mkdir()
         download.http(resource, output_file, DownloadOptions())
-        self._assert_file_exists(output_file)
+        assert_file_exists(output_file)
 
-    def test_google_cloud_storage(self):
+    @pytest.mark.slow
+    def test_google_cloud_storage(self, tmp_path):
         resource = model.DownloadableResource(url="gs://monarch-test/kghub_downloader_test_file.yaml")
-        output_file = output_files["google_cloud_storage"]
+        output_file = tmp_path / output_files["google_cloud_storage"]
         download.google_cloud_storage(resource, output_file, DownloadOptions())
-        self._assert_file_exists(output_file)
+        assert_file_exists(output_file)
 
-    def test_google_drive(self):
+    @pytest.mark.slow
+    def test_google_drive(self, tmp_path):
         resource = model.DownloadableResource(url="gdrive:10ojJffrPSl12OMcu4gyx0fak2CNu6qOs")
-        output_file = output_files["google_drive_1"]
+        output_file = tmp_path / output_files["google_drive_1"]
         download.google_drive(resource, output_file, DownloadOptions())
-        self._assert_file_exists(output_file)
+        assert_file_exists(output_file)
 
+    @pytest.mark.slow
     @pytest.mark.usefixtures('mock_s3_test_file')
-    def test_s3(self):
+    def test_s3(self, tmp_path):
         resource = model.DownloadableResource(url="s3://monarch-test/kghub_downloader_test_file.yaml")
-        output_file = output_files["s3"]
+        output_file = tmp_path / output_files["s3"]
         download.s3(resource, output_file, DownloadOptions())
-        self._assert_file_exists(output_file)
+        assert_file_exists(output_file)
 
-    def test_git(self):
+    @pytest.mark.slow
+    def test_git(self, tmp_path):
         resource = model.DownloadableResource(url="git://Knowledge-Graph-Hub/kg-microbe/testfile.zip")
-        output_file = output_files["git"]
+        output_file = tmp_path / output_files["git"]
         download.git(resource, output_file, DownloadOptions())
-        self._assert_file_exists(output_file)
-
-    @pytest.mark.usefixtures('mock_s3_test_file')
-    def test_yaml_spec_download(self):
-        download_from_yaml(yaml_file="example/download.yaml", output_dir="test/output")
-        for file in output_files.values():
-            self._assert_file_exists(file)
-
-    def test_tag(self):
-        files = ["test/output/zfin/fish_phenotype.txt", "test/output/test_file.yaml"]
-        tagged_files = ["test/output/gdrive_test_1.txt"]
-
-        for file in files:
-            if exists(file):
-                os.remove(file)
-
-        download_from_yaml(yaml_file="example/download.yaml", output_dir="test/output", tags=["testing"])
+        assert_file_exists(output_file)
+
+    @pytest.mark.usefixtures("mock_s3_test_file", "mock_example_resources")
+    def test_all_schemes_parallel(self, tmp_path):
+        downloads = [
+            (download.http, "https://zfin.org/downloads/phenoGeneCleanData_fish.txt", "https"),
+            (
+                download.google_cloud_storage,
+                "gs://monarch-test/kghub_downloader_test_file.yaml",
+                "google_cloud_storage",
+            ),
+            (download.google_drive, "gdrive:10ojJffrPSl12OMcu4gyx0fak2CNu6qOs", "google_drive_1"),
+            (download.s3, "s3://monarch-test/kghub_downloader_test_file.yaml", "s3"),
+            (download.git, "git://Knowledge-Graph-Hub/kg-microbe/testfile.zip", "git"),
+        ]
+        (tmp_path / output_files["https"]).parent.mkdir()
+
+        async def fetch_all():
+            return await asyncio.gather(
+                *(
+                    asyncio.to_thread(
+                        fn, model.DownloadableResource(url=url), tmp_path / output_files[key], DownloadOptions()
+                    )
+                    for fn, url, key in downloads
+                ),
+                return_exceptions=True,
+            )
+
+        for result in asyncio.run(fetch_all()):
+            if isinstance(result, BaseException):
+                raise result
+
+        for _, _, key in downloads:
+            assert_file_exists(tmp_path / output_files[key])
+
+    @pytest.mark.usefixtures("mock_example_resources")
+    def test_tag(self, tmp_path):
+        files = ["zfin/fish_phenotype.txt", "test_file.yaml"]
+        tagged_files = ["gdrive_test_1.txt"]
+
+        download_from_yaml(yaml_file="example/download.yaml", output_dir=str(tmp_path), tags=["testing"])
 
         for file in tagged_files:
-            self._assert_file_exists(Path(file))
+            assert_file_exists(tmp_path / file)
 
         for file in files:
             if file not in tagged_files:
-                self.assertFalse(os.path.exists(file))
+                assert not (tmp_path / file).exists()
+
+
+def test_yaml_spec_download(downloaded_example_outputs):
+    for file in output_files.values():
+        assert_file_exists(downloaded_example_outputs / file)
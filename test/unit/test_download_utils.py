@@ -0,0 +1,113 @@
+import os
+import threading
+import time
+from unittest import mock
+
+import pytest
+import yaml
+
+from kghub_downloader import download, schemes
+from kghub_downloader.download_utils import deduplicate_resources, download_from_yaml, download_resource
+from kghub_downloader.model import DownloadableResource, DownloadOptions
+
+# ruff: noqa: D100, D103
+
+
+def test_deduplicate_resources():
+    resources = [
+        DownloadableResource(url="http://example.com/a.txt"),
+        DownloadableResource(url="http://example.com/a.txt", tag="copy"),
+        DownloadableResource(url="http://example.com/a.txt", local_name="b.txt"),
+        DownloadableResource(url="http://example.com/c.txt"),
+    ]
+    deduplicated = deduplicate_resources(resources)
+    assert deduplicated == [resources[0], resources[2], resources[3]]
+
+
+def test_deduplicate_resources_same_path(caplog):
+    # Different URLs with the same output path would be downloaded into the same file at the same time
+    resources = [
+        DownloadableResource(url="http://example.com/a.txt", local_name="data.txt"),
+        DownloadableResource(url="http://example.com/b.txt", local_name="data.txt"),
+        DownloadableResource(url="http://example.com/b.txt"),
+    ]
+    deduplicated = deduplicate_resources(resources)
+    assert deduplicated == [resources[0], resources[2]]
+    assert "data.txt is already downloaded from http://example.com/a.txt" in caplog.text
+
+
+def test_download_from_yaml_concurrent(tmp_path):
+    ids = ["id1", "id2", "id3"]
+    yaml_file = tmp_path / "download.yaml"
+    yaml_file.write_text(yaml.dump([{"url": f"https://example.com/{i}.yaml"} for i in ids]))
+
+    # Every download waits for the others to start, so this only passes if they all run at the same time
+    barrier = threading.Barrier(len(ids), timeout=5)
+
+    def fake_download(item, outfile_path, options):
+        barrier.wait()
+        outfile_path.write_text(item.url)
+
+    output_dir = tmp_path / "output"
+    with mock.patch.dict(schemes.available_schemes, {"https": fake_download}):
+        download_from_yaml(str(yaml_file), str(output_dir), DownloadOptions(max_workers=len(ids)))
+
+    for i in ids:
+        assert (output_dir / f"{i}.yaml").read_text() == f"https://example.com/{i}.yaml"
+
+
+def test_download_from_yaml_caches_parsed_yaml(tmp_path):
+    yaml_file = tmp_path / "download.yaml"
+    yaml_file.write_text("[]")
+
+    with mock.patch("yaml.load", wraps=yaml.load) as yaml_load:
+        download_from_yaml(str(yaml_file), str(tmp_path / "output"))
+        download_from_yaml(str(yaml_file), str(tmp_path / "output"))
+        assert yaml_load.call_count == 1
+
+        # The file is parsed again once it has been modified
+        mtime_ns = yaml_file.stat().st_mtime_ns
+        os.utime(yaml_file, ns=(mtime_ns, mtime_ns + 1_000_000))
+        download_from_yaml(str(yaml_file), str(tmp_path / "output"))
+        assert yaml_load.call_count == 2
+
+
+def test_download_resource_leaves_no_partial_file(tmp_path):
+    def failing_download(item, outfile_path, options):
+        outfile_path.write_bytes(b"partial")
+        raise RuntimeError("connection reset")
+
+    resource = DownloadableResource(url="https://example.com/a.txt")
+    with mock.patch.dict(schemes.available_schemes, {"https": failing_download}):
+        with pytest.raises(RuntimeError):
+            download_resource(resource, tmp_path, DownloadOptions())
+
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_download_from_yaml_stops_running_downloads(tmp_path):
+    yaml_file = tmp_path / "download.yaml"
+    yaml_file.write_text(yaml.dump([{"url": "https://example.com/slow.txt"}, {"url": "https://example.com/bad.txt"}]))
+    slow_download_started = threading.Event()
+
+    def fake_download(item, outfile_path, options):
+        if item.url.endswith("bad.txt"):
+            slow_download_started.wait(timeout=5)
+            raise RuntimeError("download failed")
+
+        with download.open_with_write_progress(item, outfile_path, False) as outfile:
+            slow_download_started.set()
+            # Would take 10s, unless it is stopped
+            for _ in range(1000):
+                outfile.write(b"x" * 1024)
+                time.sleep(0.01)
+
+    output_dir = tmp_path / "output"
+    start = time.monotonic()
+    with mock.patch.dict(schemes.available_schemes, {"https": fake_download}):
+        with pytest.raises(RuntimeError):
+            download_from_yaml(str(yaml_file), str(output_dir), DownloadOptions(max_workers=2))
+
+    # The slow download was stopped, and its partial output removed, before the error was raised
+    assert time.monotonic() - start < 5
+    assert list(output_dir.iterdir()) == []
@@ -0,0 +1,49 @@
+import json
+import os
+from unittest import mock
+
+from kghub_downloader.elasticsearch import PROGRESS_BATCH_SIZE, dump_json, elastic_search_query, load_query, write_json
+
+# ruff: noqa: D100, D103
+
+
+def test_write_json_streams_records(tmp_path):
+    records = ({"id": i, "big": 2**70} for i in range(3))
+    outfile = tmp_path / "records.json"
+    write_json(records, str(outfile))
+    assert json.loads(outfile.read_text()) == [{"id": i, "big": 2**70} for i in range(3)]
+
+
+def test_write_json_empty(tmp_path):
+    outfile = tmp_path / "records.json"
+    write_json([], str(outfile))
+    assert json.loads(outfile.read_text()) == []
+
+
+def test_dump_json_fallback_matches_orjson():
+    record = {"name": "café", "values": [1, 2.5, None, True]}
+    with mock.patch("kghub_downloader.elasticsearch.orjson", None):
+        fallback = dump_json(record)
+    assert fallback == b'{"name":"caf\xc3\xa9","values":[1,2.5,null,true]}'
+    assert dump_json(record) == fallback
+
+
+def test_elastic_search_query_yields_all_records():
+    hits = [{"_id": str(i)} for i in range(PROGRESS_BATCH_SIZE + 5)]
+    with mock.patch("elasticsearch.helpers.scan", return_value=iter(hits)) as scan:
+        records = elastic_search_query(mock.MagicMock(), index="index", query={})
+        assert list(records) == hits
+    assert scan.call_args.kwargs["preserve_order"] is False
+
+
+def test_load_query_reloads_changed_file(tmp_path):
+    query_file = tmp_path / "query.json"
+    query_file.write_text('{"query": {"match_all": {}}}')
+    assert load_query(str(query_file)) == {"query": {"match_all": {}}}
+    assert load_query(str(query_file)) is load_query(str(query_file))
+
+    query_file.write_text('{"query": {"term": {"id": 1}}}')
+    # Make sure the modification time changes, even on filesystems with coarse timestamps
+    stat = query_file.stat()
+    os.utime(query_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert load_query(str(query_file)) == {"query": {"term": {"id": 1}}}
@@ -1,13 +1,22 @@
 import ftplib
 import os
+import tempfile
+import threading
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
+import pytest
+
 from kghub_downloader.download import (
+    DownloadStopped,
+    compile_glob,
     download_via_ftp,
     is_directory,
     is_matching_filename,
+    list_ftp_directory,
+    retrieve_ftp_file,
 )
 
 
@@ -20,35 +29,127 @@ class TestFTPDownload(unittest.TestCase):
     def test_download_files(self, mock_ftp):
         # Set up the mock FTP instance
         ftp_instance = mock_ftp.return_value
-        ftp_instance.nlst.side_effect = [
-            ["file1.txt", "dir1"],  # Root directory listing
-            ["file2.txt", "file3.txt"],  # dir1 directory listing
+        ftp_instance.mlsd.side_effect = [
+            # Root directory listing
+            [(".", {"type": "cdir"}), ("file1.txt", {"type": "file"}), ("dir1", {"type": "dir"})],
+            # dir1 directory listing
+            [("file2.txt", {"type": "file"}), ("file3.txt", {"type": "file"})],
         ]
-        ftp_instance.pwd.side_effect = ["/", "/dir1"]
         ftp_instance.cwd.side_effect = lambda x: x
 
-        # Mock is_directory to return True for directories and False for files
+        # Mock os.makedirs to prevent actual directory creation
+        with patch("os.makedirs") as makedirs_mock:
+            # Mock open to prevent actual file writing
+            with patch("builtins.open", new_callable=unittest.mock.mock_open()) as mock_file:
+                # Call the function to be tested
+                download_via_ftp(ftp_instance, "/", "local_dir", "*.txt")
+
+                # Check that makedirs was called for the local directory structure
+                makedirs_mock.assert_called_with("local_dir/dir1", exist_ok=True)
+
+                # Check that the file was opened for writing
+                mock_file.assert_any_call("local_dir/file1.txt", "wb")
+                mock_file.assert_any_call("local_dir/dir1/file2.txt", "wb")
+                mock_file.assert_any_call("local_dir/dir1/file3.txt", "wb")
+
+                # Check that the correct number of files were attempted to be downloaded
+                self.assertEqual(mock_file.call_count, 3)
+
+        # MLSD says which entries are directories, so there is no need to probe them
+        ftp_instance.nlst.assert_not_called()
+        ftp_instance.pwd.assert_not_called()
+
+    def test_list_ftp_directory_without_mlsd(self):
+        # Servers that don't support MLSD are listed with NLST
+        self.mock_ftp.mlsd.side_effect = ftplib.error_perm("500 Unknown command")  # noqa: S321
+        self.mock_ftp.nlst.return_value = ["file1.txt", "dir1"]
+
         with patch(
             "kghub_downloader.download.is_directory",
             side_effect=lambda ftp, name: name == "dir1",
         ):
-            # Mock os.makedirs to prevent actual directory creation
-            with patch("os.makedirs") as makedirs_mock:
-                # Mock open to prevent actual file writing
-                with patch("builtins.open", new_callable=unittest.mock.mock_open()) as mock_file:
-                    # Call the function to be tested
-                    download_via_ftp(ftp_instance, "/", "local_dir", "*.txt")
+            self.assertEqual(list_ftp_directory(self.mock_ftp), [("file1.txt", False), ("dir1", True)])
+
+    def test_list_ftp_directory_symlinks(self):
+        # Entries that are neither files nor directories, like symlinks, are probed
+        self.mock_ftp.mlsd.return_value = [
+            ("file1.txt", {"type": "file"}),
+            ("dir1", {"type": "dir"}),
+            ("dir_link", {"type": "OS.unix=slink:/dir1"}),
+            ("file_link", {"type": "OS.unix=slink:/file1.txt"}),
+        ]
+
+        with patch(
+            "kghub_downloader.download.is_directory",
+            side_effect=lambda ftp, name: name == "dir_link",
+        ) as is_directory_mock:
+            self.assertEqual(
+                list_ftp_directory(self.mock_ftp),
+                [("file1.txt", False), ("dir1", True), ("dir_link", True), ("file_link", False)],
+            )
+        self.assertEqual(is_directory_mock.call_count, 2)
+
+    def _listing_connection(self):
+        # Set up the connection that lists the files, and writes the name of every file it is asked for
+        ftp_instance = MagicMock()
+        ftp_instance.mlsd.side_effect = [
+            # Root directory listing
+            [("file1.txt", {"type": "file"}), ("dir1", {"type": "dir"})],
+            # dir1 directory listing
+            [("file2.txt", {"type": "file"}), ("file3.txt", {"type": "file"})],
+        ]
+        ftp_instance.retrbinary.side_effect = lambda cmd, callback: callback(cmd.encode())
+        return ftp_instance
 
-                    # Check that makedirs was called for the local directory structure
-                    makedirs_mock.assert_called_with("local_dir/dir1", exist_ok=True)
+    def _assert_downloaded(self, local_dir):
+        for remote_path in ["file1.txt", "dir1/file2.txt", "dir1/file3.txt"]:
+            with open(os.path.join(local_dir, remote_path), "rb") as f:
+                self.assertEqual(f.read(), f"RETR {remote_path}".encode())
 
-                    # Check that the file was opened for writing
-                    mock_file.assert_any_call("local_dir/file1.txt", "wb")
-                    mock_file.assert_any_call("local_dir/dir1/file2.txt", "wb")
-                    mock_file.assert_any_call("local_dir/dir1/file3.txt", "wb")
+    def test_download_files_parallel(self):
+        ftp_instance = self._listing_connection()
 
-                    # Check that the correct number of files were attempted to be downloaded
-                    self.assertEqual(mock_file.call_count, 3)
+        # Every worker connection writes the name of the file it was asked for
+        connections = []
+
+        def connect():
+            worker_ftp = MagicMock()
+            worker_ftp.retrbinary.side_effect = lambda cmd, callback: callback(cmd.encode())
+            connections.append(worker_ftp)
+            return worker_ftp
+
+        with tempfile.TemporaryDirectory() as local_dir:
+            download_via_ftp(ftp_instance, "/", local_dir, "*.txt", connect=connect, max_workers=3)
+            self._assert_downloaded(local_dir)
+
+        # The listing connection counts as one of the workers, and is left open for the caller to close
+        self.assertEqual(len(connections), 2)
+        for worker_ftp in connections:
+            worker_ftp.cwd.assert_called_once_with("/")
+            worker_ftp.close.assert_called_once()
+        ftp_instance.close.assert_not_called()
+        self.assertEqual(sum(ftp.retrbinary.call_count for ftp in [ftp_instance, *connections]), 3)
+
+    def test_download_files_connections_refused(self):
+        ftp_instance = self._listing_connection()
+        connect = MagicMock(side_effect=ftplib.error_temp("421 Too many connections"))  # noqa: S321
+
+        with tempfile.TemporaryDirectory() as local_dir:
+            download_via_ftp(ftp_instance, "/", local_dir, "*.txt", connect=connect, max_workers=3)
+            self._assert_downloaded(local_dir)
+
+        # Everything is transferred over the listing connection instead
+        connect.assert_called_once()
+        self.assertEqual(ftp_instance.retrbinary.call_count, 3)
+
+    def test_retrieve_ftp_file_stopped(self):
+        # Transfers stop at the next block once the stop event is set
+        event = threading.Event()
+        event.set()
+        self.mock_ftp.retrbinary.side_effect = lambda cmd, callback: callback(b"block")
+
+        with tempfile.TemporaryDirectory() as local_dir, self.assertRaises(DownloadStopped):
+            retrieve_ftp_file(self.mock_ftp, "file1.txt", os.path.join(local_dir, "file1.txt"), event)
 
     def test_is_directory_true(self):
         # Mock the pwd and cwd methods for a directory
@@ -68,19 +169,37 @@ class TestFTPDownload(unittest.TestCase):
         # Test with no pattern provided (should always return True)
         self.assertTrue(is_matching_filename("file.jpg", None))
 
+        # Test with a precompiled pattern
+        pattern = compile_glob("*.txt")
+        self.assertTrue(is_matching_filename("file.txt", pattern))
+        self.assertFalse(is_matching_filename("file.jpg", pattern))
+        self.assertFalse(is_matching_filename("file.txt.jpg", pattern))
+        self.assertIsNone(compile_glob(None))
+
+    @pytest.mark.slow
     @unittest.skipIf(os.getenv("GITHUB_ACTIONS") == "true", "This test needs credentials to run.")
     def test_actual_upload_download(self):
         # Credentials available at: https://dlptest.com/ftp-test/
-        pwd = Path.cwd()
-        output_dir = pwd / "test/output"
-        resources_dir = pwd / "test/resources"
-        # Set up a real FTP server
-        ftp = ftplib.FTP("ftp.dlptest.com")
-        ftp.login(os.environ["FTP_USERNAME"], os.environ["FTP_PASSWORD"])
-        # upload the file ../resources/test_file.txt to the server
-        ftp.storbinary("STOR test_file.txt", open(f"{resources_dir}/testfile.txt", "rb"))
-        # download the file test_file.txt from the server
-        download_via_ftp(ftp, "/", f"{output_dir}", "*.txt")
-        # Check that the file was downloaded correctly
-        self.assertTrue(os.path.exists(f"{output_dir}/test_file.txt"))
-        os.remove(f"{output_dir}/test_file.txt")
+        resources_dir = Path.cwd() / "test/resources"
+        file_names = [f"test_file_{i}.txt" for i in range(4)]
+
+        def connect():
+            # Set up a connection to a real FTP server
+            ftp = ftplib.FTP("ftp.dlptest.com")  # noqa: S321
+            ftp.login(os.environ["FTP_USERNAME"], os.environ["FTP_PASSWORD"])
+            return ftp
+
+        def upload(file_name):
+            with connect() as ftp, open(resources_dir / "testfile.txt", "rb") as f:
+                ftp.storbinary(f"STOR {file_name}", f)
+
+        # upload copies of ../resources/testfile.txt to the server, each over its own connection
+        with ThreadPoolExecutor(max_workers=len(file_names)) as executor:
+            list(executor.map(upload, file_names))
+
+        # download the files from the server in parallel
+        with connect() as ftp, tempfile.TemporaryDirectory() as output_dir:
+            download_via_ftp(ftp, "/", output_dir, "test_file_*.txt", connect=connect)
+            # Check that the files were downloaded correctly
+            for file_name in file_names:
+                self.assertTrue(os.path.exists(f"{output_dir}/{file_name}"))
@@ -0,0 +1,64 @@
+import io
+from unittest import mock
+
+import pytest
+
+from kghub_downloader import download
+from kghub_downloader.model import DownloadableResource, DownloadOptions
+
+# ruff: noqa: D100, D103
+
+RELEASES = [
+    {
+        "tag_name": "v0.0.2",
+        "assets": [{"name": "a.zip", "browser_download_url": "https://example.com/v0.0.2/a.zip"}],
+    },
+    {
+        "tag_name": "v0.0.1",
+        "assets": [
+            {"name": "a.zip", "browser_download_url": "https://example.com/v0.0.1/a.zip"},
+            {"name": "b.zip", "browser_download_url": "https://example.com/v0.0.1/b.zip"},
+        ],
+    },
+]
+
+
+@pytest.fixture
+def mock_github():
+    """Mock the GitHub releases API and asset downloads."""
+
+    def get(url, **kwargs):
+        response = mock.MagicMock()
+        if url.startswith("https://api.github.com/"):
+            response.json.return_value = RELEASES
+        else:
+            response.headers = {}
+            response.raw = io.BytesIO(url.encode())
+        return response
+
+    download._RELEASES_CACHE.clear()
+    download._RELEASE_ASSETS_CACHE.clear()
+    with mock.patch.object(download._SESSION, "get", side_effect=get) as mock_get:
+        yield mock_get
+    download._RELEASES_CACHE.clear()
+    download._RELEASE_ASSETS_CACHE.clear()
+
+
+def test_git_releases_fetched_once_per_repository(mock_github, tmp_path):
+    for asset in ["a.zip", "b.zip"]:
+        resource = DownloadableResource(url=f"git://owner/repo/{asset}")
+        download.git(resource, tmp_path / asset, DownloadOptions())
+
+    api_calls = [c for c in mock_github.call_args_list if c.args[0].startswith("https://api.github.com/")]
+    assert len(api_calls) == 1
+    assert (tmp_path / "b.zip").read_bytes() == b"https://example.com/v0.0.1/b.zip"
+
+
+def test_git_tagged_asset(mock_github, tmp_path):
+    resource = DownloadableResource(url="git://owner/repo/a.zip", tag="v0.0.1")
+    download.git(resource, tmp_path / "a.zip", DownloadOptions())
+    assert (tmp_path / "a.zip").read_bytes() == b"https://example.com/v0.0.1/a.zip"
+
+    resource = DownloadableResource(url="git://owner/repo/a.zip")
+    download.git(resource, tmp_path / "a.zip", DownloadOptions())
+    assert (tmp_path / "a.zip").read_bytes() == b"https://example.com/v0.0.2/a.zip"
@@ -0,0 +1,124 @@
+import gzip
+import io
+import threading
+from dataclasses import dataclass, field
+from typing import Dict, List
+from unittest import mock
+
+import pytest
+import responses
+import yaml
+
+from kghub_downloader import download
+from kghub_downloader.download_utils import download_from_yaml
+from kghub_downloader.model import DownloadableResource, DownloadOptions
+
+# ruff: noqa: D100, D102, D103, D105, D107
+
+
+class FakeRaw(io.BytesIO):
+    """A raw response body that records the size of every read."""
+
+    def __init__(self, body: bytes):
+        super().__init__(body)
+        self.decode_content = False
+        self.read_sizes: List[int] = []
+
+    def read(self, size=-1):
+        self.read_sizes.append(size)
+        return super().read(size)
+
+
+@dataclass
+class FakeResponse:
+    """A streamed response with a fixed body."""
+
+    body: bytes
+    headers: Dict[str, str] = field(default_factory=dict)
+
+    def __post_init__(self):
+        self.raw = FakeRaw(self.body)
+
+    def raise_for_status(self):
+        pass
+
+
+@pytest.fixture
+def mock_session_get():
+    """Mock HTTP responses from the shared session."""
+
+    def get(url, **kwargs):
+        return FakeResponse(url.encode())
+
+    with mock.patch.object(download._SESSION, "get", side_effect=get) as mock_get:
+        yield mock_get
+
+
+def test_http_reuses_session(mock_session_get, tmp_path):
+    ids = ["id1", "id2", "id3"]
+    with mock.patch("requests.get") as mock_requests_get:
+        for resource_id in ids:
+            resource = DownloadableResource(url=f"https://example.com/{resource_id}.yaml")
+            download.http(resource, tmp_path / f"{resource_id}.yaml", DownloadOptions())
+
+    mock_requests_get.assert_not_called()
+    assert mock_session_get.call_count == len(ids)
+    for resource_id in ids:
+        assert (tmp_path / f"{resource_id}.yaml").read_bytes() == f"https://example.com/{resource_id}.yaml".encode()
+
+
+def test_http_streams_chunks(tmp_path):
+    response = FakeResponse(b"chunk1chunk2chunk3")
+
+    resource = DownloadableResource(url="https://example.com/big.txt")
+    with mock.patch.object(download._SESSION, "get", return_value=response) as mock_get:
+        download.http(resource, tmp_path / "big.txt", DownloadOptions())
+
+    assert mock_get.call_args.kwargs["stream"] is True
+    assert response.raw.decode_content is True
+    assert set(response.raw.read_sizes) == {download.CHUNK_SIZE}
+    assert (tmp_path / "big.txt").read_bytes() == b"chunk1chunk2chunk3"
+
+
+@responses.activate
+def test_http_retries_server_errors(tmp_path):
+    url = "https://example.com/flaky.txt"
+    responses.get(url, status=503)
+    responses.get(url, body=b"test content")
+
+    with mock.patch("time.sleep"):
+        download.http(DownloadableResource(url=url), tmp_path / "flaky.txt", DownloadOptions())
+
+    assert len(responses.calls) == 2
+    assert (tmp_path / "flaky.txt").read_bytes() == b"test content"
+
+
+def test_http_downloads_share_session_concurrently(tmp_path):
+    max_workers = 4
+    urls = [f"https://example.com/file{i}.txt" for i in range(max_workers)]
+    yaml_file = tmp_path / "download.yaml"
+    yaml_file.write_text(yaml.dump([{"url": url} for url in urls]))
+
+    # Every request waits for the others to be sent, so this only passes if they are all in flight at the same time
+    barrier = threading.Barrier(max_workers, timeout=5)
+
+    def get(url, **kwargs):
+        barrier.wait()
+        return FakeResponse(url.encode())
+
+    with mock.patch.object(download._SESSION, "get", side_effect=get) as mock_get:
+        download_from_yaml(str(yaml_file), str(tmp_path / "output"), DownloadOptions(max_workers=max_workers))
+
+    assert mock_get.call_count == max_workers
+    for i, url in enumerate(urls):
+        assert (tmp_path / "output" / f"file{i}.txt").read_bytes() == url.encode()
+
+
+@responses.activate
+def test_http_decodes_content_encoding(tmp_path):
+    url = "https://example.com/encoded.txt"
+    responses.get(url, body=gzip.compress(b"test content"), headers={"Content-Encoding": "gzip"})
+
+    download.http(DownloadableResource(url=url), tmp_path / "encoded.txt", DownloadOptions())
+
+    assert (tmp_path / "encoded.txt").read_bytes() == b"test content"
@@ -1,12 +1,19 @@
+import base64
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from unittest import mock
 
-from kghub_downloader.upload import mirror_to_bucket
+import google_crc32c  # type: ignore
+from google.api_core.exceptions import Forbidden  # type: ignore
+
+from kghub_downloader.clients import gcs_client, s3_client
+from kghub_downloader.upload import S3_TRANSFER_CONFIG, mirror_to_bucket
 
 # ruff: noqa: D100, D103
 
 
 # proper test
-@mock.patch("google.cloud.storage.Client")
+@mock.patch("kghub_downloader.upload.gcs_client")
 def test_mirror(client):
     mirror_to_bucket(
         local_file="test/resources/testfile.txt",
@@ -21,12 +28,74 @@ def test_mirror(client):
     blob.assert_called_with("kghub_test_upload.txt")
 
 
-def test_mirror_to_bucket_s3(mock_empty_bucket):
-    result = mirror_to_bucket(
+@mock.patch("kghub_downloader.upload.gcs_client")
+def test_mirror_skips_unchanged(client):
+    local_file = Path("test/resources/testfile.txt")
+    blob = client().bucket().blob()
+    blob.size = local_file.stat().st_size
+    blob.crc32c = base64.b64encode(google_crc32c.value(local_file.read_bytes()).to_bytes(4, "big")).decode()
+
+    mirror_to_bucket(local_file=local_file, bucket_url="gs://monarch-test/", remote_file="kghub_test_upload.txt")
+    blob.upload_from_file.assert_not_called()
+
+    blob.crc32c = "AAAAAA=="
+    mirror_to_bucket(local_file=local_file, bucket_url="gs://monarch-test/", remote_file="kghub_test_upload.txt")
+    blob.upload_from_file.assert_called_once()
+
+
+@mock.patch("kghub_downloader.upload.gcs_client")
+def test_mirror_uploads_without_read_access(client):
+    # Credentials with only storage.objects.create can't read the existing blob
+    blob = client().bucket().blob()
+    blob.reload.side_effect = Forbidden("storage.objects.get access denied")
+
+    mirror_to_bucket(
         local_file="test/resources/testfile.txt",
-        bucket_url="s3://monarch-test/",
+        bucket_url="gs://monarch-test/",
         remote_file="kghub_test_upload.txt",
     )
+    blob.upload_from_file.assert_called_once()
+
+
+def test_mirror_reuses_gcs_client():
+    gcs_client.cache_clear()
+    try:
+        with mock.patch("kghub_downloader.clients.storage.Client") as client:
+            for remote_file in ["kghub_test_upload_1.txt", "kghub_test_upload_2.txt"]:
+                mirror_to_bucket(
+                    local_file="test/resources/testfile.txt",
+                    bucket_url="gs://monarch-test/",
+                    remote_file=remote_file,
+                )
+    finally:
+        gcs_client.cache_clear()
+
+    # Credentials are only discovered once, for the first upload
+    client.assert_called_once()
+    assert client().bucket().blob().upload_from_file.call_count == 2
+
+
+def test_s3_client_created_once():
+    s3_client.cache_clear()
+    try:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            clients = list(executor.map(lambda _: s3_client(), range(32)))
+    finally:
+        s3_client.cache_clear()
+
+    # Threads asking for the client at the same time all get the same one
+    assert len({id(client) for client in clients}) == 1
+
+
+def test_mirror_to_bucket_s3(mock_empty_bucket):
+    s3 = s3_client()
+    with mock.patch.object(s3, "upload_fileobj", wraps=s3.upload_fileobj) as upload_fileobj:
+        result = mirror_to_bucket(
+            local_file="test/resources/testfile.txt",
+            bucket_url="s3://monarch-test/",
+            remote_file="kghub_test_upload.txt",
+        )
+    assert upload_fileobj.call_args.kwargs["Config"] is S3_TRANSFER_CONFIG
 
     # Check if the file was created in the bucket
     bucket = mock_empty_bucket.Bucket("monarch-test")
@@ -34,3 +103,17 @@ def test_mirror_to_bucket_s3(mock_empty_bucket):
     assert len(files_in_bucket) == 1
     assert files_in_bucket[0].key == "kghub_test_upload.txt"
     assert result is True
+
+
+def test_mirror_to_bucket_s3_skips_unchanged(mock_empty_bucket):
+    mirror_args = {
+        "local_file": "test/resources/testfile.txt",
+        "bucket_url": "s3://monarch-test/",
+        "remote_file": "kghub_test_upload.txt",
+    }
+    assert mirror_to_bucket(**mirror_args) is True
+
+    with mock.patch.object(s3_client(), "upload_fileobj") as upload_fileobj:
+        assert mirror_to_bucket(**mirror_args) is True
+
+    upload_fileobj.assert_not_called()
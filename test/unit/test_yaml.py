@@ -1,3 +1,4 @@
+import os
 import unittest
 from unittest.mock import patch
 
@@ -24,6 +25,20 @@ class TestYAMLValidate(unittest.TestCase):
             )
             self.assertEqual(resource.expanded_url, "http://example.com/expanded")
 
+    def test_url_expansion_ignores_other_braces(self):
+        with patch.dict("os.environ", {"ENVVAR": "expanded"}, clear=True):
+            resource = DownloadableResource(url='http://example.com/{ENVVAR}?q={"a": 1}&r={}')
+            self.assertEqual(resource.expanded_url, 'http://example.com/expanded?q={"a": 1}&r={}')
+
+    def test_url_expansion_cached(self):
+        with patch.dict("os.environ", {"TEST_HOST": "example.com", "TEST_KEY": "key"}, clear=True):
+            resource = DownloadableResource(url="https://{TEST_HOST}/fakefile.txt?key={TEST_KEY}")
+            with patch("os.getenv", wraps=os.getenv) as getenv:
+                for _ in range(1000):
+                    self.assertEqual(resource.expanded_url, "https://example.com/fakefile.txt?key=key")
+            # The environment is only read the first time the expanded URL is accessed
+            self.assertEqual(getenv.call_count, 2)
+
     def test_invalid_url_expansion(self):
         with patch.dict("os.environ", clear=True) as environ, self.assertRaises(ValueError):
             if "ENVVAR" in environ:
@@ -42,3 +57,31 @@ class TestYAMLValidate(unittest.TestCase):
                 tag="tag",
                 local_name="local_name",
             )
+
+    def test_url_schemes(self):
+        for url in [
+            "http://example.com/",
+            "https://example.com/",
+            "gs://bucket/file",
+            "gdrive:10ojJffrPSl12OMcu4gyx0fak2CNu6qOs",
+            "git://owner/repo/file.zip",
+            "s3://bucket/file",
+            "ftp://example.com/",
+        ]:
+            self.assertEqual(DownloadableResource(url=url).url, url)
+
+        # The scheme has to be at the start of the URL, and be the whole scheme
+        for url in ["illegal-gs://bucket/file", "httpx://example.com/", "example.com/s3://bucket"]:
+            with self.assertRaises(ValidationError, msg=url):
+                DownloadableResource(url=url)
+
+    def test_is_compressed_file(self):
+        for local_name in ["data.gz", "data.tar.gz", "data.ZIP", "data.bz2", "data.xz", "data.zst"]:
+            resource = DownloadableResource(url="http://example.com/", local_name=local_name)
+            self.assertTrue(resource.is_compressed_file, local_name)
+
+        resource = DownloadableResource(url="http://example.com/data.gz?key=secret")
+        self.assertTrue(resource.is_compressed_file)
+
+        resource = DownloadableResource(url="http://example.com/data.tsv")
+        self.assertFalse(resource.is_compressed_file)